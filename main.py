@@ -5,169 +5,597 @@ Expression Evaluator with GUI (Tkinter)
 Features:
 - Parses and evaluates arithmetic expressions in infix form.
 - Supports: +, -, *, /, ^ (power), parentheses, unary minus, decimals.
-- Converts infix -> postfix (Shunting Yard) and evaluates postfix.
+- Converts infix -> postfix (Shunting Yard, or Pratt for parenthesis-heavy input)
+  and evaluates postfix.
 - Shows step-by-step postfix form and evaluation stack trace in the GUI.
 - Basic error handling (syntax errors, division by zero).
 """
 
+import array
+import collections
+import functools
+import itertools
 import math
+import re
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 
+try:  # optional: runs long bytecode programs in a native kernel
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+
 # --------------------------
 # Tokenizer / Lexer
 # --------------------------
 
+# Token kinds. Tokens are (kind, value) pairs: numbers carry their float
+# value, operators their OP_* code and parentheses their symbol. Postfix
+# output only contains TOK_NUM and TOK_OP, so it doubles as an
+# (opcode, operand) program for evaluate_postfix.
+TOK_NUM = 0
+TOK_OP = 1
+TOK_LP = 2
+TOK_RP = 3
+
+# Operator codes, used as indexes into the precedence tables below.
+OP_ADD = 0
+OP_SUB = 1
+OP_MUL = 2
+OP_DIV = 3
+OP_POW = 4
+OP_NEG = 5  # unary minus
+
+_OP_CODES = {'+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '/': OP_DIV, '^': OP_POW}
+_OP_NAMES = ('+', '-', '*', '/', '^', 'u-')
+
+# Shared token instances: the tokenizer reuses these instead of building a
+# new tuple per operator, and the parser stack tests '(' by identity.
+_LPAREN = (TOK_LP, '(')
+_RPAREN = (TOK_RP, ')')
+_NEG = (TOK_OP, OP_NEG)
+_OP_TOKENS = {ch: (TOK_OP, code) for ch, code in _OP_CODES.items()}
+
+# Master lexer pattern: whitespace, a numeric literal, or an operator/paren.
+# Numeric literals are validated by float() so '1.2.3' and '.' are rejected.
+_TOKEN_RE = re.compile(r'\s+|(?P<num>[\d.]+)|(?P<op>[+\-*/^()])')
+
+# Kinds of previous token after which '-' is unary
+_UNARY_CTX = frozenset({TOK_OP, TOK_LP})
+
+# Whitespace around operators/parens is insignificant; elsewhere (e.g.
+# between two numbers) it separates tokens, so it is collapsed, not removed.
+_OP_SPACE_RE = re.compile(r'\s*([+\-*/^()])\s*')
+_NORM_RE = re.compile(r'\s+')
+
+def _normalize(expr: str):
+    """Canonical spelling of expr: tokenizes identically to expr itself."""
+    return _NORM_RE.sub(' ', _OP_SPACE_RE.sub(r'\1', expr)).strip()
+
 def tokenize(expr: str):
     """
-    Convert expression string into list of tokens.
-    Tokens: numbers (ints/floats), operators, parentheses.
-    Recognizes unary minus (as 'u-') during tokenization by context.
+    Convert expression string into a tuple of (kind, value) tokens.
+    Tokens: numbers (parsed to float), operators (as OP_* codes), parentheses.
+    Recognizes unary minus (as OP_NEG) during tokenization by context.
+    Results are memoized per whitespace-normalized input, so '3+4' and
+    ' 3 +  4' share one (immutable) token tuple.
     """
+    return _tokenize_impl_cached(_normalize(expr))
+
+def _tokenize_impl(expr: str):
     tokens = []
-    i = 0
-    n = len(expr)
-    while i < n:
-        ch = expr[i]
-        if ch.isspace():
-            i += 1
-            continue
-        if ch.isdigit() or ch == '.':
-            num_chars = [ch]
-            i += 1
-            while i < n and (expr[i].isdigit() or expr[i] == '.'):
-                num_chars.append(expr[i])
-                i += 1
-            num_str = ''.join(num_chars)
-            # Validate number (at most one dot)
-            if num_str.count('.') > 1:
-                raise ValueError(f"Invalid numeric literal: {num_str}")
-            tokens.append(num_str)
+    pos = 0
+    depth = 0  # paren nesting, checked here so parsers never see unbalanced input
+    for m in _TOKEN_RE.finditer(expr):
+        if m.start() != pos:
+            # finditer skipped over something no alternative matches
+            raise ValueError(f"Unsupported character: '{expr[pos]}'")
+        pos = m.end()
+        num_str = m.group('num')
+        if num_str is not None:
+            try:
+                tokens.append((TOK_NUM, _Literal(num_str)))
+            except ValueError:
+                raise ValueError(f"Invalid numeric literal: {num_str}") from None
             continue
+        ch = m.group('op')
+        if ch is None:
+            continue  # whitespace
         # operators and parentheses
-        if ch in '+-*/^()':
-            # detect unary minus: if ch == '-' and either at start, or previous token is operator or '('
-            if ch == '-':
-                prev = tokens[-1] if tokens else None
-                if prev is None or (prev in ('+', '-', '*', '/', '^', '(', 'u-')):
-                    # unary minus token
-                    tokens.append('u-')
-                    i += 1
-                    continue
-            tokens.append(ch)
-            i += 1
-            continue
-        # unsupported character
-        raise ValueError(f"Unsupported character: '{ch}'")
-    return tokens
+        if ch == '(':
+            depth += 1
+            tokens.append(_LPAREN)
+        elif ch == ')':
+            depth -= 1
+            if depth < 0:
+                raise ValueError("Mismatched parentheses")
+            tokens.append(_RPAREN)
+        elif ch == '-' and (not tokens or tokens[-1][0] in _UNARY_CTX):
+            # unary minus: at start, or previous token is operator or '('
+            tokens.append(_NEG)
+        else:
+            tokens.append(_OP_TOKENS[ch])
+    if pos != len(expr):
+        raise ValueError(f"Unsupported character: '{expr[pos]}'")
+    if depth != 0:
+        raise ValueError("Mismatched parentheses")
+    return tuple(tokens)
+
+_tokenize_impl_cached = functools.lru_cache(maxsize=256)(_tokenize_impl)
+
+class _Literal(float):
+    """A number token's value that remembers how it was written."""
+    __slots__ = ('text',)
+
+    def __new__(cls, text):
+        self = super().__new__(cls, text)
+        self.text = text
+        return self
+
+def format_tokens(tokens):
+    """Render tokens as a space-separated string (e.g. for displaying postfix)."""
+    parts = []
+    for kind, val in tokens:
+        if kind == TOK_NUM:
+            if isinstance(val, _Literal):
+                parts.append(val.text)  # as typed, e.g. '1.50'
+            elif val.is_integer() and abs(val) < 2 ** 53:
+                parts.append(str(int(val)))
+            else:
+                parts.append(repr(val))
+        elif kind == TOK_OP:
+            parts.append(_OP_NAMES[val])
+        else:
+            parts.append(val)
+    return ' '.join(parts)
 
 # --------------------------
 # Shunting Yard -> Infix to Postfix
 # --------------------------
 
-OPERATORS = {
-    '+': {'prec': 2, 'assoc': 'L'},
-    '-': {'prec': 2, 'assoc': 'L'},
-    '*': {'prec': 3, 'assoc': 'L'},
-    '/': {'prec': 3, 'assoc': 'L'},
-    '^': {'prec': 4, 'assoc': 'R'},
-    'u-': {'prec': 5, 'assoc': 'R'},  # unary minus: high precedence, right-assoc
-}
+# Indexed by operator code: +, -, *, /, ^, u-
+# (unary minus: high precedence, right-assoc)
+_PREC = (2, 2, 3, 3, 4, 5)
+_RIGHT_ASSOC = (False, False, False, False, True, True)
+
+def _unexpected(tok):
+    return ValueError(f"Unexpected token: '{format_tokens([tok])}'")
+
+def check_syntax(tokens):
+    """
+    Validate operand/operator order of infix tokens. Both parsers call this
+    first, so they accept and reject the same input. Paren balance is not
+    rechecked: tokenize already guarantees it.
+    """
+    expect_operand = True
+    for tok in tokens:
+        kind = tok[0]
+        if expect_operand:
+            # number, '(' or unary minus
+            if kind == TOK_NUM:
+                expect_operand = False
+            elif not (kind == TOK_LP or (kind == TOK_OP and tok[1] == OP_NEG)):
+                raise _unexpected(tok)
+        elif kind == TOK_OP and tok[1] != OP_NEG:
+            expect_operand = True
+        elif kind != TOK_RP:
+            raise _unexpected(tok)
+    if expect_operand:
+        raise ValueError("Unexpected end of expression")
 
 def infix_to_postfix(tokens):
-    """Shunting-yard algorithm. Returns list of postfix tokens."""
+    """
+    Shunting-yard algorithm. Returns list of postfix tokens.
+    Parentheses are expected to be balanced (tokenize guarantees this).
+    """
+    # A lone number is already postfix
+    if len(tokens) == 1 and tokens[0][0] == TOK_NUM:
+        return list(tokens)
+    check_syntax(tokens)
     output = []
     stack = []
+    # bind hot methods/tables once instead of looking them up per token
+    output_append = output.append
+    stack_append = stack.append
+    stack_pop = stack.pop
+    prec = _PREC
+    right_assoc = _RIGHT_ASSOC
     for tok in tokens:
-        if is_number(tok):
-            output.append(tok)
-        elif tok in OPERATORS:
-            o1 = tok
-            while stack and stack[-1] in OPERATORS:
-                o2 = stack[-1]
-                p1 = OPERATORS[o1]['prec']
-                p2 = OPERATORS[o2]['prec']
-                if (OPERATORS[o1]['assoc'] == 'L' and p1 <= p2) or \
-                   (OPERATORS[o1]['assoc'] == 'R' and p1 < p2):
-                    output.append(stack.pop())
+        kind = tok[0]
+        if kind == TOK_NUM:
+            output_append(tok)
+        elif kind == TOK_OP:
+            o1 = tok[1]
+            p1 = prec[o1]
+            r1 = right_assoc[o1]
+            while stack and stack[-1] is not _LPAREN:
+                p2 = prec[stack[-1][1]]
+                if (not r1 and p1 <= p2) or (r1 and p1 < p2):
+                    output_append(stack_pop())
                 else:
                     break
-            stack.append(o1)
-        elif tok == '(':
-            stack.append(tok)
-        elif tok == ')':
+            stack_append(tok)
+        elif kind == TOK_LP:
+            stack_append(_LPAREN)  # the shared instance, so "is _LPAREN" holds (see its definition)
+        elif kind == TOK_RP:
             # pop until '('
-            while stack and stack[-1] != '(':
-                output.append(stack.pop())
-            if not stack:
-                raise ValueError("Mismatched parentheses")
-            stack.pop()  # remove '('
+            while stack[-1] is not _LPAREN:
+                output_append(stack_pop())
+            stack_pop()  # remove '('
         else:
             raise ValueError(f"Unknown token in infix_to_postfix: {tok}")
     while stack:
-        top = stack.pop()
-        if top in ('(', ')'):
+        output_append(stack_pop())
+    return output
+
+# --------------------------
+# Pratt parser (alternative for parenthesis-heavy input)
+# --------------------------
+
+# Nesting beyond this stays with Shunting-Yard, which does not recurse
+_PRATT_MAX_DEPTH = 500
+
+def pratt_parse(tokens):
+    """
+    Top-down operator precedence (Pratt) parser.
+    Returns the same postfix tokens as infix_to_postfix.
+    """
+    check_syntax(tokens)
+    output = []
+    output_append = output.append
+    n = len(tokens)
+    pos = 0
+
+    def parse_expr(min_prec):
+        nonlocal pos
+        if pos >= n:
+            raise ValueError("Unexpected end of expression")
+        tok = tokens[pos]
+        kind, val = tok
+        pos += 1
+        # prefix position: number, unary minus or parenthesized group
+        if kind == TOK_NUM:
+            output_append(tok)
+        elif kind == TOK_OP and val == OP_NEG:
+            parse_expr(_PREC[OP_NEG])
+            output_append(tok)
+        elif kind == TOK_LP:
+            parse_expr(0)
+            if pos >= n:
+                raise ValueError("Mismatched parentheses")
+            if tokens[pos][0] != TOK_RP:
+                raise _unexpected(tokens[pos])
+            pos += 1
+        else:
+            raise _unexpected(tok)
+        # infix position: binary operators binding at least min_prec
+        while pos < n:
+            tok = tokens[pos]
+            if tok[0] != TOK_OP:
+                break
+            op = tok[1]
+            p = _PREC[op]
+            if p < min_prec:
+                break
+            pos += 1
+            parse_expr(p if _RIGHT_ASSOC[op] else p + 1)
+            output_append(tok)
+
+    parse_expr(0)
+    if pos != n:
+        if tokens[pos][0] == TOK_RP:
             raise ValueError("Mismatched parentheses")
-        output.append(top)
+        raise _unexpected(tokens[pos])
     return output
 
+def parse(tokens):
+    """
+    Infix tokens -> postfix tokens. Parenthesis-heavy input (more than one
+    '(' per five tokens) goes to the Pratt parser, everything else to
+    Shunting-Yard.
+    """
+    n_lp = depth = max_depth = 0
+    for kind, _ in tokens:
+        if kind == TOK_LP:
+            n_lp += 1
+            depth += 1
+            if depth > max_depth:
+                max_depth = depth
+        elif kind == TOK_RP:
+            depth -= 1
+    if n_lp * 5 > len(tokens) and max_depth <= _PRATT_MAX_DEPTH:
+        try:
+            return pratt_parse(tokens)
+        except RecursionError:
+            pass  # e.g. long chains of unary minus / '^'; fall back
+    return infix_to_postfix(tokens)
+
 # --------------------------
 # Postfix Evaluation
 # --------------------------
 
-def evaluate_postfix(postfix_tokens):
-    """Evaluate postfix expression. Returns (value, evaluation_trace)"""
-    stack = []
+def evaluate_postfix(postfix_tokens, collect_trace=False):
+    """
+    Evaluate postfix expression. Returns (value, evaluation_trace).
+    The trace is only built when collect_trace is True; otherwise it is empty.
+    """
+    stack = array.array('d')  # unboxed C doubles
     trace = []
-    for tok in postfix_tokens:
-        if is_number(tok):
-            val = float(tok)
-            stack.append(val)
-            trace.append(f"PUSH {val}")
-        elif tok in OPERATORS:
-            if tok == 'u-':
+    push = stack.append
+    log = trace.append
+    dispatch = _DISPATCH
+    for tag, pay in postfix_tokens:
+        if tag == TOK_NUM:
+            push(pay)
+            if collect_trace:
+                log(f"PUSH {pay}")
+        elif tag == TOK_OP:
+            # operators run through the same handlers as the bytecode VM
+            if pay == OP_NEG:
                 if not stack:
                     raise ValueError("Insufficient operands for unary minus")
-                a = stack.pop()
-                res = -a
-                stack.append(res)
-                trace.append(f"UNARY_MINUS {a} -> {res}")
+                if collect_trace:
+                    a = stack[-1]
+                dispatch[pay](stack)
+                if collect_trace:
+                    log(f"UNARY_MINUS {a} -> {stack[-1]}")
             else:
                 if len(stack) < 2:
-                    raise ValueError(f"Insufficient operands for '{tok}'")
-                b = stack.pop()
-                a = stack.pop()
-                res = apply_op(a, b, tok)
-                stack.append(res)
-                trace.append(f"{a} {tok} {b} -> {res}")
+                    raise ValueError(f"Insufficient operands for '{_OP_NAMES[pay]}'")
+                if collect_trace:
+                    a = stack[-2]
+                    b = stack[-1]
+                dispatch[pay](stack)
+                if collect_trace:
+                    log(f"{a} {_OP_NAMES[pay]} {b} -> {stack[-1]}")
         else:
-            raise ValueError(f"Unknown token in evaluate_postfix: {tok}")
+            raise ValueError(f"Unknown token in evaluate_postfix: {pay}")
     if len(stack) != 1:
         raise ValueError("The expression could not be evaluated to a single value (syntax error).")
     return stack[0], trace
 
+_sqrt = math.sqrt
+_isinf = math.isinf
+
+# (op, a, b) -> result memo for apply_op; stops growing at _APPLY_CACHE_MAX
+_APPLY_CACHE = {}
+_APPLY_CACHE_MAX = 10000
+
 def apply_op(a, b, op):
-    if op == '+':
+    # Operands are floats everywhere in the pipeline; coerce anyway so an int
+    # caller neither gets nor plants an int result under an equal float key.
+    a = float(a)
+    b = float(b)
+    key = (op, a, b)
+    v = _APPLY_CACHE.get(key)
+    if v is not None:
+        return v
+    v = _apply_op(a, b, op)
+    # Zero operands are not memoized: 0.0 == -0.0, so their keys would alias
+    # results that differ in sign (e.g. -0.0 * 5 vs 0.0 * 5).
+    if a and b and len(_APPLY_CACHE) < _APPLY_CACHE_MAX:
+        _APPLY_CACHE[key] = v
+    return v
+
+def _apply_op(a, b, op):
+    if op == OP_ADD:
         return a + b
-    if op == '-':
+    if op == OP_SUB:
         return a - b
-    if op == '*':
+    if op == OP_MUL:
         return a * b
-    if op == '/':
+    if op == OP_DIV:
         if b == 0:
             raise ZeroDivisionError("Division by zero")
         return a / b
-    if op == '^':
-        # power
-        return math.pow(a, b)
+    if op == OP_POW:
+        # power; common small exponents avoid a general pow() call
+        if b == 0.5 and a > 0:  # not -0.0: sqrt keeps the sign, pow does not
+            return _sqrt(a)
+        if b == 2.0:
+            r = a * a
+        elif b == 3.0:
+            r = a * a * a
+        else:
+            # math.pow rather than ** so negative bases raise instead of going complex
+            return math.pow(a, b)
+        if _isinf(r) and not _isinf(a):
+            raise OverflowError("math range error")  # as math.pow would
+        return r
     raise ValueError(f"Unsupported operator: {op}")
 
-def is_number(token):
-    try:
-        float(token)
-        return True
-    except Exception:
-        return False
+# --------------------------
+# Bytecode compilation / VM
+# --------------------------
+
+OP_PUSH = 6  # followed by an index into the constant pool
+
+def fold_postfix(postfix_tokens):
+    """
+    Constant-fold postfix tokens: an operator whose operands are literals is
+    applied now and replaced by its result. Every operand in this grammar is
+    a literal, so a valid expression folds down to a single number token.
+    """
+    stack = []  # postfix token list of each pending operand
+    for tok in postfix_tokens:
+        kind, val = tok
+        if kind == TOK_NUM:
+            stack.append([tok])
+        elif kind == TOK_OP and val == OP_NEG:
+            if not stack:
+                raise ValueError("Insufficient operands for unary minus")
+            a = stack[-1]
+            if len(a) == 1:  # a single-token operand is a literal
+                stack[-1] = [(TOK_NUM, -a[0][1])]
+            else:
+                a.append(tok)
+        elif kind == TOK_OP:
+            if len(stack) < 2:
+                raise ValueError(f"Insufficient operands for '{_OP_NAMES[val]}'")
+            b = stack.pop()
+            a = stack[-1]
+            if len(a) == 1 and len(b) == 1:
+                stack[-1] = [(TOK_NUM, apply_op(a[0][1], b[0][1], val))]
+            else:
+                a.extend(b)
+                a.append(tok)
+        else:
+            raise ValueError(f"Unknown token in fold_postfix: {val}")
+    if len(stack) != 1:
+        raise ValueError("The expression could not be evaluated to a single value (syntax error).")
+    return stack[0]
+
+def compile_postfix(postfix_tokens, fold=False):
+    """
+    Compile postfix tokens into (bytecode, constants) for evaluate_bytecode.
+    With fold=True, constant subexpressions are folded first (see fold_postfix).
+    Operand counts are checked here, so the VM loop needs no stack checks.
+    """
+    if fold:
+        postfix_tokens = fold_postfix(postfix_tokens)
+    code = array.array('i')
+    consts = array.array('d')
+    depth = 0
+    for kind, tok in postfix_tokens:
+        if kind == TOK_NUM:
+            code.append(OP_PUSH)
+            code.append(len(consts))
+            consts.append(tok)
+            depth += 1
+        elif kind == TOK_OP and tok == OP_NEG:
+            if depth < 1:
+                raise ValueError("Insufficient operands for unary minus")
+            code.append(OP_NEG)
+        elif kind == TOK_OP:
+            if depth < 2:
+                raise ValueError(f"Insufficient operands for '{_OP_NAMES[tok]}'")
+            code.append(tok)
+            depth -= 1
+        else:
+            raise ValueError(f"Unknown token in compile_postfix: {tok}")
+    if depth != 1:
+        raise ValueError("The expression could not be evaluated to a single value (syntax error).")
+    return code, consts
+
+def _vm_add(stack):
+    b = stack.pop()
+    stack[-1] += b
+
+def _vm_sub(stack):
+    b = stack.pop()
+    stack[-1] -= b
+
+def _vm_mul(stack):
+    b = stack.pop()
+    stack[-1] *= b
+
+def _vm_div(stack):
+    b = stack.pop()
+    stack[-1] = apply_op(stack[-1], b, OP_DIV)
+
+def _vm_pow(stack):
+    b = stack.pop()
+    stack[-1] = apply_op(stack[-1], b, OP_POW)
+
+def _vm_neg(stack):
+    stack[-1] = -stack[-1]
+
+# Handlers indexed by operator code (OP_PUSH is handled inline by the VM)
+_DISPATCH = (_vm_add, _vm_sub, _vm_mul, _vm_div, _vm_pow, _vm_neg)
+
+# Programs shorter than this stay in the Python VM: for them the native
+# call overhead outweighs the interpreter overhead it removes.
+_NATIVE_MIN_CODE = 64
+
+def evaluate_bytecode(code, consts):
+    """Run bytecode produced by compile_postfix. Returns the value."""
+    if numba is not None and len(code) >= _NATIVE_MIN_CODE:
+        return _evaluate_native(code, consts)
+    return _evaluate_python(code, consts)
+
+def _evaluate_python(code, consts):
+    stack = array.array('d')
+    push = stack.append
+    dispatch = _DISPATCH
+    pc = 0
+    n = len(code)
+    while pc < n:
+        op = code[pc]
+        if op == OP_PUSH:
+            push(consts[code[pc + 1]])
+            pc += 2
+        else:
+            dispatch[op](stack)
+            pc += 1
+    return stack[0]
+
+# Status codes returned by the native kernel; errors are raised on the Python side
+_NATIVE_OK = 0
+_NATIVE_ZERO_DIV = 1
+_NATIVE_DOMAIN = 2
+_NATIVE_RANGE = 3
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _run_native(code, consts, stack):
+        """Native counterpart of the Python VM loop. Returns (value, status)."""
+        sp = 0
+        pc = 0
+        n = len(code)
+        while pc < n:
+            op = code[pc]
+            if op == OP_PUSH:
+                stack[sp] = consts[code[pc + 1]]
+                sp += 1
+                pc += 2
+                continue
+            pc += 1
+            if op == OP_NEG:
+                stack[sp - 1] = -stack[sp - 1]
+                continue
+            sp -= 1
+            a = stack[sp - 1]
+            b = stack[sp]
+            if op == OP_ADD:
+                r = a + b
+            elif op == OP_SUB:
+                r = a - b
+            elif op == OP_MUL:
+                r = a * b
+            elif op == OP_DIV:
+                if b == 0.0:
+                    return 0.0, _NATIVE_ZERO_DIV
+                r = a / b
+            elif b == 0.5 and a > 0.0:
+                r = math.sqrt(a)
+            elif b == 2.0 or b == 3.0:
+                r = a * a if b == 2.0 else a * a * a
+                if math.isinf(r) and not math.isinf(a):
+                    return 0.0, _NATIVE_RANGE
+            else:
+                # mirror math.pow's ValueError/OverflowError cases
+                if (a == 0.0 and b < 0.0 and math.isfinite(b)) or \
+                   (a < 0.0 and math.isfinite(a) and math.isfinite(b) and b != math.floor(b)):
+                    return 0.0, _NATIVE_DOMAIN
+                r = math.pow(a, b)
+                if math.isinf(r) and math.isfinite(a) and math.isfinite(b):
+                    return 0.0, _NATIVE_RANGE
+            stack[sp - 1] = r
+        return stack[0], _NATIVE_OK
+
+def _evaluate_native(code, consts):
+    # Every stack slot is filled by an OP_PUSH, so len(consts) bounds the depth
+    value, status = _run_native(np.frombuffer(code, dtype=np.intc),
+                                np.frombuffer(consts, dtype=np.float64),
+                                np.empty(len(consts), dtype=np.float64))
+    if status == _NATIVE_ZERO_DIV:
+        raise ZeroDivisionError("Division by zero")
+    if status == _NATIVE_DOMAIN:
+        raise ValueError("math domain error")
+    if status == _NATIVE_RANGE:
+        raise OverflowError("math range error")
+    return value
 
 # --------------------------
 # High-level evaluate function
@@ -177,14 +605,33 @@ def evaluate_expression(expr: str):
     """
     Full pipeline:
     1. Tokenize
-    2. Infix -> Postfix
-    3. Evaluate Postfix
+    2. Infix -> Postfix (Shunting-Yard or Pratt, see parse)
+    3. Compile postfix to bytecode and run it on the VM for the value
+    4. Walk the postfix once more to collect the trace shown in the GUI
     Returns: (value, tokens, postfix_tokens, trace)
+    Results are memoized per whitespace-normalized expression.
     """
-    tokens = tokenize(expr)
-    postfix = infix_to_postfix(tokens)
-    value, trace = evaluate_postfix(postfix)
-    return value, tokens, postfix, trace
+    return _evaluate_cached(_normalize(expr))
+
+@functools.lru_cache(maxsize=512)
+def _evaluate_cached(expr_normalized: str):
+    # Errors propagate out of lru_cache without being stored.
+    tokens = tokenize(expr_normalized)
+    postfix = parse(tokens)
+    value = evaluate_bytecode(*compile_postfix(postfix))
+    _, trace = evaluate_postfix(postfix, collect_trace=True)
+    return value, tokens, tuple(postfix), tuple(trace)
+
+def format_result(val):
+    """
+    Display form of a result: integers exactly (no '.0') while they fit in
+    17 digits, anything else to 12 significant digits. -0.0 shows as 0.
+    """
+    if val == 0:
+        val = 0.0
+    if val.is_integer() and abs(val) < 1e17:
+        return format(val, '.17g')
+    return format(val, '.12g')
 
 # --------------------------
 # GUI (Tkinter)
@@ -248,6 +695,11 @@ class ExpressionEvaluatorApp:
         self.history_box = scrolledtext.ScrolledText(out_frame, height=6, width=90, font=("Consolas", 11))
         self.history_box.grid(row=7, column=0, pady=(0,10))
         self.history_box.configure(state='disabled')
+        # History lives in a bounded buffer; the widget is rebuilt from it
+        # once per idle period rather than on every evaluation.
+        self._history = collections.deque(maxlen=200)
+        self._history_unshown = 0  # newest entries not yet in the widget
+        self._history_lines = collections.deque()  # line count of each shown entry
 
         # Status
         self.status_var = tk.StringVar(value="Ready")
@@ -288,20 +740,15 @@ class ExpressionEvaluatorApp:
         try:
             val, tokens, postfix, trace = evaluate_expression(expr)
             # display postfix as space-separated
-            postfix_str = ' '.join(postfix)
+            postfix_str = format_tokens(postfix)
             self.postfix_box.delete("1.0", tk.END)
             self.postfix_box.insert(tk.END, postfix_str)
             # display result
-            # if integer-equivalent, show as int
-            if abs(val - round(val)) < 1e-12:
-                display_val = str(int(round(val)))
-            else:
-                display_val = str(val)
+            display_val = format_result(val)
             self.result_var.set(display_val)
             # trace
             self.trace_box.delete("1.0", tk.END)
-            for line in trace:
-                self.trace_box.insert(tk.END, line + "\n")
+            self.trace_box.insert(tk.END, ''.join(line + "\n" for line in trace))
             # append to history
             self.append_history(expr, postfix_str, display_val)
             self.status_var.set("Evaluated successfully")
@@ -313,9 +760,31 @@ class ExpressionEvaluatorApp:
             self.status_var.set(f"Error: {e}")
 
     def append_history(self, expr, postfix, result):
+        self._history.append((expr, postfix, result))
+        self._history_unshown += 1
+        if self._history_unshown == 1:
+            self.root.after_idle(self.flush_history)
+
+    def flush_history(self):
+        # append only the entries added since the last flush, in one insert
+        n = min(self._history_unshown, len(self._history))
+        self._history_unshown = 0
+        if not n:
+            return
+        start = len(self._history) - n
+        entries = [f"> {expr}\n  Postfix: {postfix}\n  Result: {result}\n\n"
+                   for expr, postfix, result in itertools.islice(self._history, start, None)]
+        self._history_lines.extend(entry.count("\n") for entry in entries)
         self.history_box.configure(state='normal')
-        self.history_box.insert(tk.END, f"> {expr}\n  Postfix: {postfix}\n  Result: {result}\n\n")
+        self.history_box.insert(tk.END, ''.join(entries))
+        # drop the oldest lines once the widget holds more than maxlen entries
+        excess = 0
+        while len(self._history_lines) > self._history.maxlen:
+            excess += self._history_lines.popleft()
+        if excess:
+            self.history_box.delete("1.0", f"{excess + 1}.0")
         self.history_box.configure(state='disabled')
+        self.history_box.see(tk.END)
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,277 @@
+import math
+import random
+import unittest
+from unittest import mock
+
+import main
+
+
+def _random_expression(rng, depth=0):
+    """A random, syntactically valid infix expression."""
+    r = rng.random()
+    if depth > 6 or r < 0.3:
+        return rng.choice(['0', '1', '2', '3', '0.5', '7'])
+    if r < 0.45:
+        return '-' + _random_expression(rng, depth + 1)
+    if r < 0.6:
+        return '(' + _random_expression(rng, depth + 1) + ')'
+    return (_random_expression(rng, depth + 1) + rng.choice('+-*/^')
+            + _random_expression(rng, depth + 1))
+
+
+def _outcome(func, *args):
+    """Result of func(*args), or the type and message of the error it raised."""
+    try:
+        return func(*args)
+    except (ValueError, ZeroDivisionError, OverflowError) as e:
+        return type(e), str(e)
+
+
+def _parse_or_error(parser, tokens):
+    try:
+        return parser(tokens)
+    except ValueError as e:
+        return str(e)
+
+
+class TokenizeTest(unittest.TestCase):
+
+    def test_whitespace_variants_share_tokens(self):
+        tokens = main.tokenize("3+4")
+        self.assertIs(main.tokenize(" 3 +  4"), tokens)
+        self.assertIs(main.tokenize("3\t+\n4"), tokens)
+
+    def test_space_still_separates_numbers(self):
+        for expr in ("1 2", "1  2", "1\t2"):
+            self.assertEqual(main.tokenize(expr), ((main.TOK_NUM, 1.0), (main.TOK_NUM, 2.0)))
+        self.assertEqual(main.tokenize("1 .5"), ((main.TOK_NUM, 1.0), (main.TOK_NUM, 0.5)))
+
+    def test_normalized_errors_unchanged(self):
+        for expr in ("3 $ 4", "3\t@4", "2 + x", "3 + 4 \u00e9", "(1 + 2", "1 + 2)", "1. .2 . 3"):
+            with self.subTest(expr=expr):
+                self.assertEqual(_outcome(main.tokenize, expr), _outcome(main._tokenize_impl, expr))
+                self.assertIs(_outcome(main.tokenize, expr)[0], ValueError)
+
+
+class ParserAgreementTest(unittest.TestCase):
+    """pratt_parse and infix_to_postfix must accept and reject the same input."""
+
+    CASES = [
+        # valid
+        "3 + 4 * 2 / (1 - 5) ^ 2 ^ 3", "-3 + 4 * (2 - 1)", "2^3^2", "8-3-2",
+        "-2^2", "2^-2", "2^-2^3", "2*-3^2", "--2", "((((1+2))))*((3))",
+        "-(-(-(4)))", "42", "(5)",
+        # invalid
+        "3 + + 4", "2()", "2()+1+1", "(1)2*", "((1))2*", "()", "3 4", "-",
+        "1+", "(1)(2)", "*3", "(3 4)",
+    ]
+
+    def assertAgree(self, expr):
+        tokens = main.tokenize(expr)
+        self.assertEqual(_parse_or_error(main.infix_to_postfix, tokens),
+                         _parse_or_error(main.pratt_parse, tokens), expr)
+
+    def test_fixed_cases(self):
+        for expr in self.CASES:
+            self.assertAgree(expr)
+
+    def test_rejected_regardless_of_paren_count(self):
+        for expr in ("2()", "2()+1+1", "(1)2*", "((1))2*"):
+            with self.assertRaises(ValueError):
+                main.evaluate_expression(expr)
+
+    def test_random_token_sequences(self):
+        rng = random.Random(1)
+        pieces = ['(', ')', '1', '2', '0.5', '+', '-', '*', '/', '^']
+        checked = 0
+        while checked < 5000:
+            expr = ' '.join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+            try:
+                main.tokenize(expr)
+            except ValueError:
+                continue  # unbalanced parentheses never reach the parsers
+            self.assertAgree(expr)
+            checked += 1
+
+
+class PowerTest(unittest.TestCase):
+    """The apply_op fast paths must behave like math.pow."""
+
+    def test_overflow_raises_for_every_exponent(self):
+        for b in (2.0, 3.0, 4.0):
+            with self.assertRaises(OverflowError):
+                main.apply_op(1e200, b, main.OP_POW)
+
+    def test_sqrt_of_negative_zero(self):
+        self.assertEqual(str(main.apply_op(-0.0, 0.5, main.OP_POW)), "0.0")
+
+    def test_fast_paths_match_math_pow(self):
+        for a in (-3.0, -0.5, 0.0, 1.5, 7.0, float('inf'), float('-inf')):
+            for b in (2.0, 3.0):
+                self.assertEqual(main.apply_op(a, b, main.OP_POW), math.pow(a, b))
+        self.assertEqual(main.apply_op(2.0, 0.5, main.OP_POW), math.pow(2.0, 0.5))
+
+
+class ApplyOpCacheTest(unittest.TestCase):
+    """The (op, a, b) memo in apply_op must not change any result."""
+
+    def setUp(self):
+        main._APPLY_CACHE.clear()
+
+    def test_int_operands_do_not_leak_int_results(self):
+        self.assertIs(type(main.apply_op(2, 3, main.OP_POW)), float)
+        result = main.apply_op(2.0, 3.0, main.OP_POW)
+        self.assertIs(type(result), float)
+        self.assertEqual(result, 8.0)
+
+    def test_signed_zero_operands(self):
+        self.assertEqual(str(main.apply_op(0.0, 5.0, main.OP_MUL)), "0.0")
+        self.assertEqual(str(main.apply_op(-0.0, 5.0, main.OP_MUL)), "-0.0")
+        self.assertEqual(str(main.apply_op(5.0, -0.0, main.OP_MUL)), "-0.0")
+        self.assertEqual(str(main.apply_op(0.0, 5.0, main.OP_MUL)), "0.0")
+
+    def test_cached_result_is_reused(self):
+        main.apply_op(3.0, 0.7, main.OP_POW)
+        self.assertIn((main.OP_POW, 3.0, 0.7), main._APPLY_CACHE)
+        self.assertEqual(main.apply_op(3.0, 0.7, main.OP_POW), math.pow(3.0, 0.7))
+
+
+class FormatTokensTest(unittest.TestCase):
+
+    def test_numbers_show_as_typed(self):
+        postfix = main.evaluate_expression("12345678901234567890 + 1.50 * .5")[2]
+        self.assertEqual(main.format_tokens(postfix), "12345678901234567890 1.50 .5 * +")
+
+    def test_computed_numbers(self):
+        tokens = [(main.TOK_NUM, 7.0), (main.TOK_NUM, 2.0 ** 60), (main.TOK_NUM, 0.25)]
+        self.assertEqual(main.format_tokens(tokens), "7 1.152921504606847e+18 0.25")
+
+
+class FormatResultTest(unittest.TestCase):
+
+    def test_integers_are_exact(self):
+        self.assertEqual(main.format_result(2.0 ** 40), "1099511627776")
+        self.assertEqual(main.format_result(1e12), "1000000000000")
+        self.assertEqual(main.format_result(7.0), "7")
+        self.assertEqual(main.format_result(-24.0), "-24")
+
+    def test_negative_zero(self):
+        self.assertEqual(main.format_result(-0.0), "0")
+
+    def test_fractions_and_specials(self):
+        self.assertEqual(main.format_result(1 / 3), "0.333333333333")
+        self.assertEqual(main.format_result(24.4), "24.4")
+        self.assertEqual(main.format_result(1e20), "1e+20")
+        self.assertEqual(main.format_result(float('inf')), "inf")
+
+
+@unittest.skipIf(main.numba is None, "numba is not installed")
+class NativeKernelTest(unittest.TestCase):
+    """_evaluate_native must agree with the Python VM, errors included."""
+
+    def assertSameOutcome(self, expr):
+        code, consts = main.compile_postfix(main.parse(main.tokenize(expr)))
+        self.assertGreaterEqual(len(code), main._NATIVE_MIN_CODE, expr)
+        expected = _outcome(main._evaluate_python, code, consts)
+        actual = _outcome(main._evaluate_native, code, consts)
+        if isinstance(expected, float) and math.isnan(expected):
+            self.assertTrue(math.isnan(actual), expr)
+        else:
+            self.assertEqual(expected, actual, expr)
+            if isinstance(expected, float):
+                self.assertEqual(math.copysign(1, expected), math.copysign(1, actual), expr)
+
+    def test_long_random_programs(self):
+        rng = random.Random(2)
+        operands = ['1', '2', '3', '0.5', '7', '0']
+        for _ in range(300):
+            parts = [rng.choice(operands)]
+            for _ in range(rng.randint(32, 64)):
+                parts.append(rng.choice('+-*/^'))
+                parts.append(rng.choice(['', '-']) + rng.choice(operands))
+            self.assertSameOutcome(' '.join(parts))
+
+    def test_error_cases(self):
+        big = '1' + '0' * 400  # parses to inf
+        padding = ' + 1' * 40  # long enough for the native path
+        for expr in ("1 / 0", "(-8) ^ 0.5", "(-8) ^ (1/3)", "0 ^ -1",
+                     "0 ^ -" + big, "(10^200) ^ 2", "(10^200) ^ 3",
+                     "(10^200) ^ 4", "-(0) ^ 0.5", big + " - " + big):
+            self.assertSameOutcome(expr + padding)
+        self.assertSameOutcome("0 * -5" + " * 1" * 40)  # -0.0
+
+    def test_reached_from_evaluate_expression(self):
+        expr = ' + '.join(str(i) for i in range(100))
+        with mock.patch.object(main, '_evaluate_native', wraps=main._evaluate_native) as native:
+            value = main.evaluate_expression(expr)[0]
+        native.assert_called_once()
+        self.assertEqual(value, 4950.0)
+
+
+class BytecodeVMTest(unittest.TestCase):
+    """The bytecode VM must agree with evaluate_postfix, errors included."""
+
+    def assertSameValue(self, expected, actual, msg):
+        if isinstance(expected, float) and math.isnan(expected):
+            self.assertTrue(math.isnan(actual), msg)
+        else:
+            self.assertEqual(expected, actual, msg)
+            if isinstance(expected, float):  # signed zero must match too
+                self.assertEqual(math.copysign(1, expected), math.copysign(1, actual), msg)
+
+    def test_random_expressions(self):
+        rng = random.Random(3)
+        for _ in range(2000):
+            expr = _random_expression(rng)
+            postfix = main.parse(main.tokenize(expr))
+            expected = _outcome(lambda p: main.evaluate_postfix(p)[0], postfix)
+            for fold in (False, True):  # default compile, then folded
+                actual = _outcome(lambda p: main.evaluate_bytecode(*main.compile_postfix(p, fold=fold)),
+                                  postfix)
+                self.assertSameValue(expected, actual, (expr, fold))
+
+    def test_evaluate_expression_uses_vm_value(self):
+        value, _, postfix, trace = main.evaluate_expression("3 + 4 * 2 / (1 - 5) ^ 2 ^ 3")
+        self.assertEqual(value, main.evaluate_postfix(postfix)[0])
+        self.assertEqual(trace[-1], "3.0 + 0.0001220703125 -> 3.0001220703125")
+
+
+class FoldPostfixTest(unittest.TestCase):
+    """fold_postfix must compute what evaluate_postfix computes."""
+
+    def assertFoldsTo(self, expr):
+        postfix = main.parse(main.tokenize(expr))
+        expected = _outcome(lambda p: main.evaluate_postfix(p)[0], postfix)
+        folded = _outcome(main.fold_postfix, postfix)
+        if isinstance(expected, tuple):  # error
+            self.assertEqual(expected, folded, expr)
+            return
+        self.assertEqual(len(folded), 1, expr)
+        kind, value = folded[0]
+        self.assertEqual(kind, main.TOK_NUM, expr)
+        if math.isnan(expected):
+            self.assertTrue(math.isnan(value), expr)
+        else:
+            self.assertEqual(expected, value, expr)
+            self.assertEqual(math.copysign(1, expected), math.copysign(1, value), expr)
+
+    def test_signed_zero(self):
+        for expr in ("0*-5", "-0", "-(0)*5", "0*5"):
+            self.assertFoldsTo(expr)
+        self.assertEqual(str(main.fold_postfix(main.parse(main.tokenize("0*-5")))[0][1]), "-0.0")
+
+    def test_random_expressions(self):
+        rng = random.Random(4)
+        for _ in range(2000):
+            self.assertFoldsTo(_random_expression(rng))
+
+    def test_compile_folds_only_when_asked(self):
+        postfix = main.parse(main.tokenize("1 + 2 * 3"))
+        code, consts = main.compile_postfix(postfix)
+        self.assertEqual(list(consts), [1.0, 2.0, 3.0])
+        code, consts = main.compile_postfix(postfix, fold=True)
+        self.assertEqual((list(code), list(consts)), ([main.OP_PUSH, 0], [7.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()